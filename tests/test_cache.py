@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from vaultwarden_scheduler import cache as cache_module
+from vaultwarden_scheduler.cache import UserEmailCache
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(cache_module.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "emails.json")
+
+
+def test_positive_entry_expires_after_ttl(path, clock):
+    cache = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    cache.put("u1", "u1@example.com")
+    clock.now += 99
+    assert cache.lookup("u1") == (True, "u1@example.com")
+    clock.now += 1
+    assert cache.lookup("u1") == (False, None)
+
+
+def test_negative_entry_uses_shorter_ttl(path, clock):
+    cache = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    cache.put("gone", None)
+    assert cache.lookup("gone") == (True, None)
+    clock.now += 10
+    assert cache.lookup("gone") == (False, None)
+
+
+def test_flush_persists_buffered_entries_in_one_write(path, clock, monkeypatch):
+    cache = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    writes = []
+    original = UserEmailCache._write_file
+    monkeypatch.setattr(UserEmailCache, "_write_file", lambda self, e: (writes.append(dict(e)), original(self, e)))
+
+    cache.put("u1", "u1@example.com")
+    cache.put("u2", None)
+    assert writes == []  # put() only buffers
+    cache.flush()
+    cache.flush()  # nothing pending: no rewrite
+    assert len(writes) == 1
+
+    with open(path, encoding="utf-8") as fh:
+        on_disk = json.load(fh)
+    assert on_disk == {
+        "u1": {"email": "u1@example.com", "ts": clock.now},
+        "u2": {"email": None, "ts": clock.now},
+    }
+
+    reloaded = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    assert reloaded.lookup("u1") == (True, "u1@example.com")
+    assert reloaded.lookup("u2") == (True, None)
+
+
+def test_flush_merges_with_other_writers_and_prunes_expired(path, clock):
+    first = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    first.put("old-miss", None)
+    first.flush()
+
+    clock.now += 50  # old-miss is now past the negative TTL
+    second = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    first.put("a", "a@example.com")
+    second.put("b", "b@example.com")
+    first.flush()
+    second.flush()
+
+    with open(path, encoding="utf-8") as fh:
+        assert set(json.load(fh)) == {"a", "b"}
+
+
+def test_memory_copy_is_lru_bounded(path, clock):
+    cache = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10, maxsize=2)
+    cache.put("a", "a@example.com")
+    cache.put("b", "b@example.com")
+    assert cache.lookup("a") == (True, "a@example.com")  # a becomes most recent
+    cache.put("c", "c@example.com")
+    assert cache.lookup("b") == (False, None)
+    assert cache.lookup("a") == (True, "a@example.com")
+    assert cache.lookup("c") == (True, "c@example.com")
+
+
+def test_malformed_file_entries_are_dropped(path, clock):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(
+            {
+                "ok": {"email": "ok@example.com", "ts": clock.now},
+                "null-ts": {"email": "a@example.com", "ts": None},
+                "str-ts": {"email": "b@example.com", "ts": "yesterday"},
+                "bool-ts": {"email": "c@example.com", "ts": True},
+                "no-ts": {"email": "d@example.com"},
+                "int-email": {"email": 5, "ts": clock.now},
+                "not-a-dict": "e@example.com",
+            },
+            fh,
+        )
+    cache = UserEmailCache(path, ttl_seconds=100, negative_ttl_seconds=10)
+    assert cache.lookup("ok") == (True, "ok@example.com")
+    assert cache.lookup("null-ts") == (False, None)
+    assert cache.lookup("str-ts") == (False, None)
+
+    cache.put("new", "new@example.com")
+    cache.flush()
+    with open(path, encoding="utf-8") as fh:
+        assert set(json.load(fh)) == {"ok", "new"}
@@ -0,0 +1,263 @@
+import asyncio
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vaultwarden_scheduler import client as client_module
+from vaultwarden_scheduler.client import AsyncVaultwardenClient, VaultwardenClient
+from vaultwarden_scheduler.config import RotationPolicy, VaultwardenConfig
+from vaultwarden_scheduler.scheduler import PasswordRotationScheduler
+
+CIPHERS = [
+    {"id": "c1", "name": "one", "revisionDate": "2024-01-01T00:00:00Z", "type": 1},
+    {"id": "c2", "name": "two", "revisionDate": "2024-02-01T00:00:00Z", "collectionIds": ["a"]},
+]
+PROFILE = {"email": "owner@example.com", "organizationId": "org1"}
+ORG_USERS = {"data": [{"id": "u1", "email": "u1@example.com"}, {"id": "u2", "email": "u2@example.com"}]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    ciphers_body = b""
+    gzip_ciphers = False
+    hits = []
+
+    def do_POST(self):  # token endpoint
+        self.hits.append(("POST", self.path))
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(json.dumps({"access_token": "tok", "expires_in": 3600}).encode())
+
+    def do_GET(self):
+        self.hits.append(("GET", self.path))
+        assert self.headers["Authorization"] == "Bearer tok"
+        if self.path == "/api/accounts/profile":
+            self._send(json.dumps(PROFILE).encode())
+            return
+        if self.path == "/api/organizations/org1/users":
+            self._send(json.dumps(ORG_USERS).encode())
+            return
+        assert self.path == "/api/ciphers"
+        body = self.ciphers_body
+        if self.gzip_ciphers:
+            self._send(gzip.compress(body), {"Content-Encoding": "gzip"})
+        else:
+            self._send(body)
+
+    def do_PUT(self):  # /api/ciphers/<id>/password
+        self.hits.append(("PUT", self.path))
+        assert self.headers["Authorization"] == "Bearer tok"
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cipher_id = self.path.split("/")[3]
+        self._send(json.dumps({"id": cipher_id, "password": payload["password"]}).encode())
+
+    def _send(self, body, extra_headers=None):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.hits = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def config(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("ROTATION_EMAIL_CACHE_FILE", str(tmp_path / "emails.json"))
+    host, port = server.server_address
+    return VaultwardenConfig(base_url=f"http://{host}:{port}", client_id="id", client_secret="secret")
+
+
+@pytest.fixture
+def client(config):
+    vw = VaultwardenClient(config)
+    yield vw
+    vw.close()
+
+
+@pytest.fixture
+def async_client(config):
+    return AsyncVaultwardenClient(config)
+
+
+def _serve(body, gzipped=False):
+    _Handler.ciphers_body = body
+    _Handler.gzip_ciphers = gzipped
+
+
+@pytest.mark.skipif(client_module.ijson is None, reason="ijson not installed")
+@pytest.mark.parametrize(
+    "body",
+    [
+        json.dumps({"object": "list", "data": CIPHERS, "continuationToken": None}).encode(),
+        json.dumps(CIPHERS).encode(),
+        b"  \n" + json.dumps({"data": CIPHERS}).encode(),
+    ],
+    ids=["envelope", "bare-list", "leading-whitespace"],
+)
+def test_iter_ciphers_streams_both_shapes(client, body):
+    _serve(body)
+    assert list(client.iter_ciphers()) == CIPHERS
+
+
+@pytest.mark.skipif(client_module.ijson is None, reason="ijson not installed")
+def test_iter_ciphers_decodes_gzip(client):
+    # Large enough that the body spans several raw reads past the peeked head.
+    ciphers = [dict(CIPHERS[0], id=f"c{i}") for i in range(500)]
+    _serve(json.dumps({"data": ciphers}).encode(), gzipped=True)
+    assert list(client.iter_ciphers()) == ciphers
+
+
+@pytest.mark.skipif(client_module.ijson is None, reason="ijson not installed")
+@pytest.mark.parametrize("body", [b'{"Data": []}', b'{"error": "nope"}', b""], ids=["wrong-key", "error", "empty"])
+def test_iter_ciphers_rejects_unexpected_bodies(client, body):
+    _serve(body)
+    with pytest.raises(ValueError, match="Unexpected response"):
+        list(client.iter_ciphers())
+
+
+def test_iter_ciphers_matches_list_ciphers_without_ijson(client, monkeypatch):
+    monkeypatch.setattr(client_module, "ijson", None)
+    _serve(json.dumps({"data": CIPHERS}).encode())
+    assert list(client.iter_ciphers()) == CIPHERS
+    _serve(b'{"Data": []}')
+    with pytest.raises(ValueError, match="Unexpected response"):
+        list(client.iter_ciphers())
+
+
+def test_async_client_shares_token_profile_and_roster_requests(async_client):
+    _serve(json.dumps({"data": CIPHERS}).encode())
+
+    async def run():
+        async with async_client:
+            ciphers = await async_client.list_ciphers()
+            emails = await asyncio.gather(
+                *[async_client.resolve_user_email(uid) for uid in ("u1", "u2", "u1", "gone", None)]
+            )
+        return ciphers, emails
+
+    ciphers, emails = asyncio.run(run())
+    assert ciphers == CIPHERS
+    assert emails == ["u1@example.com", "u2@example.com", "u1@example.com", "owner@example.com", "owner@example.com"]
+    assert sorted(_Handler.hits) == [
+        ("GET", "/api/accounts/profile"),
+        ("GET", "/api/ciphers"),
+        ("GET", "/api/organizations/org1/users"),
+        ("POST", "/identity/connect/token"),
+    ]
+    # The miss is cached too, so a second run needs no request at all.
+    assert async_client._user_email_cache.lookup("gone") == (True, None)
+
+
+def test_async_client_reuses_token_across_runs(async_client):
+    async def update(cipher_id):
+        async with async_client:
+            return await async_client.update_cipher_password(cipher_id, "s3cret")
+
+    assert asyncio.run(update("c1")) == {"id": "c1", "password": "s3cret"}
+    assert asyncio.run(update("c2")) == {"id": "c2", "password": "s3cret"}
+    assert _Handler.hits == [
+        ("POST", "/identity/connect/token"),
+        ("PUT", "/api/ciphers/c1/password"),
+        ("PUT", "/api/ciphers/c2/password"),
+    ]
+
+
+@pytest.mark.parametrize("call", ["list_ciphers", "get_profile", "_get_org_users"])
+def test_async_client_requires_async_with(async_client, call):
+    args = ("org1",) if call == "_get_org_users" else ()
+    with pytest.raises(RuntimeError, match="async with"):
+        asyncio.run(getattr(async_client, call)(*args))
+
+
+class _RecordingNotifier:
+    def __init__(self):
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def send_rotation_notice(self, recipient, items, policy_summary):
+        self.sent.append((recipient, [candidate.item.id for candidate in items]))
+
+
+class _ThreadedNotifier:
+    """Sync notifier with its own worker pool, like AWSSNSNotifier."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sns-publish")
+        self.threads = set()
+
+    def send_rotation_notice(self, recipient, items, policy_summary):
+        self.threads.add(threading.current_thread().name.split("_")[0])
+
+
+def _scheduler(client, async_client, notifier):
+    return PasswordRotationScheduler(
+        client=client,
+        policy=RotationPolicy(frequency_days=30),
+        notifier=notifier,
+        now_factory=lambda: datetime(2024, 6, 1, tzinfo=timezone.utc),
+        async_client=async_client,
+    )
+
+
+def test_run_once_async_notifies_each_recipient(client, async_client, monkeypatch):
+    monkeypatch.setenv("ROTATION_SNS_DIGEST", "0")
+    ciphers = [
+        dict(CIPHERS[0], id="c1", userId="u1"),
+        dict(CIPHERS[0], id="c2", userId="u2"),
+        dict(CIPHERS[0], id="c3", userId="u1"),
+        dict(CIPHERS[0], id="c4", userId="u1", revisionDate="2024-05-30T00:00:00Z"),  # not due yet
+    ]
+    _serve(json.dumps({"data": ciphers}).encode())
+    notifier = _RecordingNotifier()
+
+    candidates = asyncio.run(_scheduler(client, async_client, notifier).run_once_async())
+
+    assert [candidate.item.id for candidate in candidates] == ["c1", "c2", "c3"]
+    assert sorted(notifier.sent) == [("u1@example.com", ["c1", "c3"]), ("u2@example.com", ["c2"])]
+    assert _Handler.hits.count(("GET", "/api/organizations/org1/users")) == 1
+    # run_once_async flushes the resolved emails when it finishes.
+    with open(async_client._user_email_cache._path, encoding="utf-8") as fh:
+        assert set(json.load(fh)) == {"u1", "u2"}
+
+
+def test_run_once_async_publishes_sync_notices_on_notifier_workers(client, async_client, monkeypatch):
+    monkeypatch.setenv("ROTATION_SNS_DIGEST", "0")
+    _serve(json.dumps({"data": [dict(CIPHERS[0], id=f"c{i}", userId=f"u{i % 2 + 1}") for i in range(6)]}).encode())
+    notifier = _ThreadedNotifier()
+    try:
+        asyncio.run(_scheduler(client, async_client, notifier).run_once_async())
+    finally:
+        notifier._executor.shutdown()
+    assert notifier.threads == {"sns-publish"}
+
+
+def test_apply_rotations_async_updates_every_cipher(client, async_client):
+    scheduler = _scheduler(client, async_client, _RecordingNotifier())
+    results = asyncio.run(scheduler.apply_rotations_async({"c1": "p1", "c2": "p2"}))
+    assert results == [{"id": "c1", "password": "p1"}, {"id": "c2", "password": "p2"}]
+    assert _Handler.hits.count(("POST", "/identity/connect/token")) == 1
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import pathlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from vaultwarden_scheduler.config import RotationPolicy
+from vaultwarden_scheduler.scheduler import (
+    PasswordRotationScheduler,
+    RotationCandidate,
+    VaultItem,
+    _parse_timestamp,
+)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("2024-01-02T03:04:05Z", "2024-01-02T03:04:05+00:00"),
+        ("2024-01-02T03:04:05.1234567Z", "2024-01-02T03:04:05.123456+00:00"),
+        ("2024-01-02T03:04:05.5Z", "2024-01-02T03:04:05.500000+00:00"),
+        ("2024-01-02T03:04:05+01:30", "2024-01-02T03:04:05+01:30"),
+        ("2024-01-02T03:04:05+0130", "2024-01-02T03:04:05+01:30"),
+        ("2024-01-02T03:04:05-05:00", "2024-01-02T03:04:05-05:00"),
+        ("2024-01-02 03:04:05", "2024-01-02T03:04:05+00:00"),
+        ("2024-01-02T03:04:05.123456", "2024-01-02T03:04:05.123456+00:00"),
+        ("2024-01-02", "2024-01-02T00:00:00+00:00"),
+        ("  2024-01-02T03:04:05Z ", "2024-01-02T03:04:05+00:00"),
+    ],
+)
+def test_parse_timestamp_matches_fromisoformat(raw, expected):
+    parsed = _parse_timestamp(raw)
+    assert parsed == datetime.fromisoformat(expected)
+    assert parsed.utcoffset() == datetime.fromisoformat(expected).utcoffset()
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [None, "", "   ", "None", "2024-02-30T00:00:00Z", "2024-13-01T00:00:00Z", "2024-01-02T25:00:00Z", "yesterday"],
+)
+def test_parse_timestamp_rejects_invalid_input(raw):
+    assert _parse_timestamp(raw) is None
+
+
+def _candidate(cipher_id, due):
+    item = VaultItem(
+        id=cipher_id,
+        name=cipher_id,
+        user_id=None,
+        collection_ids=[],
+        revision_date=due - timedelta(days=30),
+        last_rotated_at=None,
+    )
+    return RotationCandidate(item=item, due_at=due)
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    monkeypatch.setenv("ROTATION_STATE_FILE", str(path))
+    return path
+
+
+@pytest.fixture
+def scheduler():
+    return PasswordRotationScheduler(client=None, policy=RotationPolicy(frequency_days=30), notifier=None)
+
+
+def test_digest_hashes_sorted_id_and_due_lines(scheduler, state_file):
+    due = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    candidates = [_candidate("b", due), _candidate("a", due + timedelta(days=1))]
+
+    assert scheduler._digest_has_changed(candidates) is True
+
+    expected = hashlib.sha256(
+        b"a|2024-03-02T00:00:00+00:00\n" + b"b|2024-03-01T00:00:00+00:00\n"
+    ).hexdigest()
+    assert json.loads(state_file.read_text()) == {"last_hash": expected}
+    assert not state_file.with_suffix(".json.tmp").exists()
+    assert scheduler._digest_has_changed(list(reversed(candidates))) is False
+    assert scheduler._digest_has_changed(candidates[:1]) is True
+
+
+def test_digest_skips_rereading_unchanged_state_file(scheduler, state_file, monkeypatch):
+    reads = []
+    original = pathlib.Path.read_text
+
+    def counting_read_text(self, *args, **kwargs):
+        reads.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(pathlib.Path, "read_text", counting_read_text)
+    candidates = [_candidate("a", datetime(2024, 3, 1, tzinfo=timezone.utc))]
+
+    assert scheduler._digest_has_changed(candidates) is True
+    assert scheduler._digest_has_changed(candidates) is False
+    assert scheduler._digest_has_changed(candidates) is False
+    assert reads == []  # our own write's mtime is remembered
+
+    # Another scheduler rewrote the file: its mtime changed, so it is read again.
+    state_file.write_text(json.dumps({"last_hash": "other"}))
+    stat = state_file.stat()
+    os.utime(state_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert scheduler._digest_has_changed(candidates) is True
+    assert reads == [state_file]
@@ -1,18 +1,20 @@
 """Password rotation scheduler utilities for Vaultwarden."""
 
 from .config import RotationPolicy, VaultwardenConfig, NotificationConfig
-from .client import VaultwardenClient
+from .client import AsyncVaultwardenClient, VaultwardenClient
 from .scheduler import PasswordRotationScheduler, RotationCandidate, VaultItem
-from .notification import AWSSNSNotifier, NotificationResult
+from .notification import AsyncAWSSNSNotifier, AWSSNSNotifier, NotificationResult
 
 __all__ = [
     "RotationPolicy",
     "VaultwardenConfig",
     "NotificationConfig",
     "VaultwardenClient",
+    "AsyncVaultwardenClient",
     "PasswordRotationScheduler",
     "RotationCandidate",
     "VaultItem",
     "AWSSNSNotifier",
+    "AsyncAWSSNSNotifier",
     "NotificationResult",
 ]
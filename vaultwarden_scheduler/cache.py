@@ -0,0 +1,170 @@
+"""On-disk cache for Vaultwarden user id -> email lookups."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+try:  # POSIX only; on other platforms concurrent writers simply race.
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 3600
+MAX_ENTRIES = 10000
+DEFAULT_MEMORY_MAXSIZE = 4096
+
+
+def _valid_entry(entry: object) -> bool:
+    if not isinstance(entry, dict):
+        return False
+    ts = entry.get("ts")
+    email = entry.get("email")
+    return (
+        isinstance(ts, (int, float))
+        and not isinstance(ts, bool)
+        and math.isfinite(ts)
+        and (email is None or isinstance(email, str))
+    )
+
+
+class UserEmailCache:
+    """Persist resolved emails (and known misses) so restarts skip the org lookup.
+
+    Entries are stored as ``{user_id: {"email": email_or_null, "ts": epoch}}``.
+    A ``null`` email records a user that was not found in the organization and
+    expires after the shorter negative TTL. The in-process copy is an LRU capped
+    at ``ROTATION_USER_CACHE_MAXSIZE`` entries.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        negative_ttl_seconds: Optional[float] = None,
+        maxsize: Optional[int] = None,
+    ) -> None:
+        self._path = path if path is not None else os.getenv("ROTATION_EMAIL_CACHE_FILE", ".email_cache.json")
+        self._ttl = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.getenv("ROTATION_EMAIL_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS)))
+        )
+        self._negative_ttl = (
+            negative_ttl_seconds
+            if negative_ttl_seconds is not None
+            else float(os.getenv("ROTATION_EMAIL_CACHE_NEGATIVE_TTL_SECONDS", str(DEFAULT_NEGATIVE_TTL_SECONDS)))
+        )
+        self._maxsize = (
+            maxsize
+            if maxsize is not None
+            else int(os.getenv("ROTATION_USER_CACHE_MAXSIZE", str(DEFAULT_MEMORY_MAXSIZE)))
+        )
+        self._entries: Optional["OrderedDict[str, Dict[str, object]]"] = None
+        self._pending: Dict[str, Dict[str, object]] = {}
+
+    def lookup(self, user_id: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(hit, email)``; ``email`` is ``None`` for a cached miss."""
+
+        entries = self._load()
+        entry = entries.get(user_id)
+        if entry is None:
+            return False, None
+        email = entry.get("email")
+        ttl = self._ttl if email else self._negative_ttl
+        if time.time() - float(entry.get("ts", 0)) >= ttl:
+            del entries[user_id]
+            return False, None
+        entries.move_to_end(user_id)
+        return True, str(email) if email else None
+
+    def put(self, user_id: str, email: Optional[str]) -> None:
+        """Record a lookup in memory; it reaches the file on the next :meth:`flush`."""
+
+        entry: Dict[str, object] = {"email": email, "ts": time.time()}
+        self._memory_put(user_id, entry)
+        if self._path:
+            self._pending[user_id] = entry
+
+    def flush(self) -> None:
+        """Write buffered entries to the cache file in a single locked rewrite."""
+
+        if not self._pending or not self._path:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            with self._locked():
+                # Merge with whatever another scheduler may have written meanwhile.
+                entries = self._read_file()
+                entries.update(pending)
+                self._write_file(self._prune(entries))
+        except OSError:
+            # Best-effort only; the in-memory copy still serves this process
+            pass
+
+    # ---- persistence helpers -------------------------------------------------------
+    def _load(self) -> "OrderedDict[str, Dict[str, object]]":
+        if self._entries is None:
+            entries = self._read_file() if self._path else {}
+            # Oldest first, so the most recently resolved users survive the cap.
+            ordered = sorted(entries.items(), key=lambda kv: float(kv[1].get("ts", 0)))
+            if self._maxsize > 0:
+                ordered = ordered[-self._maxsize:]
+            self._entries = OrderedDict(ordered)
+        return self._entries
+
+    def _memory_put(self, user_id: str, entry: Dict[str, object]) -> None:
+        entries = self._load()
+        entries[user_id] = entry
+        entries.move_to_end(user_id)
+        if self._maxsize > 0:
+            while len(entries) > self._maxsize:
+                entries.popitem(last=False)
+
+    def _read_file(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self._path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        # Drop malformed entries instead of failing later; they are simply looked up again.
+        return {str(k): v for k, v in data.items() if _valid_entry(v)}
+
+    def _write_file(self, entries: Dict[str, Dict[str, object]]) -> None:
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(entries, fh)
+        os.replace(tmp, self._path)
+
+    def _prune(self, entries: Dict[str, Dict[str, object]]) -> Dict[str, Dict[str, object]]:
+        now = time.time()
+        fresh = {
+            uid: entry
+            for uid, entry in entries.items()
+            if now - float(entry.get("ts", 0)) < (self._ttl if entry.get("email") else self._negative_ttl)
+        }
+        if len(fresh) > MAX_ENTRIES:
+            newest = sorted(fresh.items(), key=lambda kv: float(kv[1].get("ts", 0)), reverse=True)
+            fresh = dict(newest[:MAX_ENTRIES])
+        return fresh
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        # Lock a sidecar file: os.replace swaps the cache file's inode on every write.
+        with open(f"{self._path}.lock", "a") as lock_fh:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_fh, fcntl.LOCK_UN)
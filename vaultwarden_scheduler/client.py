@@ -2,35 +2,107 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import time
 import uuid
 from dataclasses import dataclass
 from collections.abc import Iterable as IterableABC
-from typing import Any, Dict, Iterable, List, Optional
-from urllib.parse import urljoin
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:  # optional: faster decoding of API responses; both accept bytes directly
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    _loads = json.loads
+
+try:  # optional: stream large cipher lists instead of decoding them in one go
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+from .cache import UserEmailCache
 from .config import VaultwardenConfig
 
 
-class VaultwardenClient:
-    """Wrapper for Vaultwarden API endpoints needed by the scheduler."""
+USER_AGENT = "vaultwarden-scheduler/1.0"
+# How long an organization roster is reused before it is fetched again.
+ORG_USERS_TTL_SECONDS = 300.0
 
-    def __init__(self, config: VaultwardenConfig, session: Optional[requests.Session] = None) -> None:
+
+def _index_org_users(payload: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        entry["id"]: entry["email"]
+        for entry in payload.get("data", [])
+        if entry.get("id") and entry.get("email")
+    }
+
+
+class _PrefixedReader:
+    """File-like wrapper that replays bytes already read from ``raw``."""
+
+    def __init__(self, head: bytes, raw: Any) -> None:
+        self._head = head
+        self._raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            if size < 0 or size >= len(self._head):
+                chunk, self._head = self._head, b""
+                if size < 0:
+                    return chunk + self._raw.read()
+                return chunk
+            chunk, self._head = self._head[:size], self._head[size:]
+            return chunk
+        return self._raw.read(size)
+
+
+_NOT_OPEN = "AsyncVaultwardenClient must be used inside 'async with'"
+
+
+class _VaultwardenAPIMixin:
+    """Endpoint URLs, token and email-cache handling shared by the sync and async clients.
+
+    Subclasses only perform the HTTP calls; everything that builds a request or
+    interprets a response lives here.
+    """
+
+    def __init__(self, config: VaultwardenConfig) -> None:
         self._config = config
-        self._session = session or requests.Session()
         self._base_url = config.base_url.rstrip("/")
+        # Endpoint URLs are fixed for the client's lifetime; build them once.
+        self._url_token = self._base_url + "/identity/connect/token"
+        self._url_ciphers = self._base_url + "/api/ciphers"
+        self._url_profile = self._base_url + "/api/accounts/profile"
         self._token: Optional[str] = None
         self._token_expiry_epoch: float = 0.0
         self._profile_cache: Optional[Dict[str, Any]] = None
-        self._user_email_cache: Dict[str, str] = {}
+        self._user_email_cache = UserEmailCache()
+        self._org_users_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+    def flush_cache(self) -> None:
+        """Write email lookups resolved since the last flush to the cache file."""
+
+        self._user_email_cache.flush()
+
+    def _url_org_users(self, org_id: str) -> str:
+        return f"{self._base_url}/api/organizations/{org_id}/users"
+
+    def _url_cipher_password(self, cipher_id: str) -> str:
+        return f"{self._base_url}/api/ciphers/{cipher_id}/password"
 
     # ---- authentication helpers -------------------------------------------------
     def _token_is_valid(self) -> bool:
         return bool(self._token) and time.time() < (self._token_expiry_epoch - 15)
 
-    def _obtain_token(self) -> None:
+    def _token_form(self, headers: MutableMapping[str, str]) -> Dict[str, str]:
+        """Return the client-credentials form, dropping any bearer token from ``headers``."""
+
         data = {
             "grant_type": "client_credentials",
             "scope": "api",
@@ -43,112 +115,381 @@ class VaultwardenClient:
         if self._config.audience:
             data["audience"] = self._config.audience
 
+        # Never present a stale bearer token to the identity endpoint.
+        headers.pop("Authorization", None)
+        return data
+
+    def _store_token(self, payload: Dict[str, Any], headers: MutableMapping[str, str]) -> None:
+        self._token = payload["access_token"]
+        expires_in = int(payload.get("expires_in", 3600))
+        self._token_expiry_epoch = time.time() + expires_in
+        headers["Authorization"] = f"Bearer {self._token}"
+
+    # ---- response helpers --------------------------------------------------------
+    @staticmethod
+    def _ciphers_from_payload(payload: Any) -> List[Dict[str, Any]]:
+        if isinstance(payload, dict) and "data" in payload:
+            return list(payload["data"])
+        if isinstance(payload, list):
+            return payload
+        raise ValueError("Unexpected response from /api/ciphers")
+
+    def _cached_org_users(self, org_id: str) -> Optional[Dict[str, str]]:
+        cached = self._org_users_cache.get(org_id)
+        if cached is not None and time.time() - cached[0] < ORG_USERS_TTL_SECONDS:
+            return cached[1]
+        return None
+
+    def _store_org_users(self, org_id: str, payload: Dict[str, Any]) -> Dict[str, str]:
+        users = _index_org_users(payload)
+        self._org_users_cache[org_id] = (time.time(), users)
+        return users
+
+    def _email_before_roster(
+        self, profile: Dict[str, Any], user_id: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Return ``(email, None)`` if no request is needed, else ``(None, org_id)`` to fetch."""
+
+        if not user_id:
+            return profile.get("email"), None
+
+        cached, email = self._user_email_cache.lookup(user_id)
+        if cached and email:
+            return email, None
+
+        # Fallback strategy: try organization members endpoint if org context present
+        # This keeps the client usable without needing every upstream change immediately.
+        org_id = profile.get("organizationId")
+        if org_id and not cached:
+            return None, org_id
+        return profile.get("email"), None
+
+    def _email_from_roster(
+        self, profile: Dict[str, Any], user_id: str, users: Optional[Dict[str, str]]
+    ) -> Optional[str]:
+        if users is not None:
+            email = users.get(user_id)
+            if email:
+                self._user_email_cache.put(user_id, email)
+                return email
+            # Remember the miss so deleted users don't trigger a roster fetch every run.
+            self._user_email_cache.put(user_id, None)
+
+        # As a final fallback return profile email to avoid dropping notifications entirely.
+        return profile.get("email")
+
+
+class VaultwardenClient(_VaultwardenAPIMixin):
+    """Wrapper for Vaultwarden API endpoints needed by the scheduler."""
+
+    def __init__(self, config: VaultwardenConfig, session: Optional[requests.Session] = None) -> None:
+        super().__init__(config)
+        if session is None:
+            session = requests.Session()
+            # Every call goes to the same host, so keep a few warm connections around
+            # and let urllib3 retry transient gateway errors instead of failing the run.
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(["GET", "PUT", "POST"]),
+                    raise_on_status=False,
+                ),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+        self._session = session
+
+    def close(self) -> None:
+        """Persist cached lookups and release pooled connections held by the session."""
+
+        self.flush_cache()
+        self._session.close()
+
+    # ---- authentication helpers -------------------------------------------------
+    def _obtain_token(self) -> None:
+        data = self._token_form(self._session.headers)
         response = self._session.post(
-            urljoin(self._base_url + "/", "identity/connect/token"),
+            self._url_token,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
             data=data,
             timeout=self._config.timeout_seconds,
         )
         response.raise_for_status()
-        payload = response.json()
-        self._token = payload["access_token"]
-        expires_in = int(payload.get("expires_in", 3600))
-        self._token_expiry_epoch = time.time() + expires_in
+        self._store_token(_loads(response.content), self._session.headers)
 
-    def _auth_headers(self) -> Dict[str, str]:
+    def _ensure_token(self) -> None:
         if not self._token_is_valid():
             self._obtain_token()
-        assert self._token  # for type-checkers
-        return {"Authorization": f"Bearer {self._token}"}
 
     # ---- public API --------------------------------------------------------------
     def list_ciphers(self) -> List[Dict[str, Any]]:
+        self._ensure_token()
         response = self._session.get(
-            urljoin(self._base_url + "/", "api/ciphers"),
-            headers=self._auth_headers(),
+            self._url_ciphers,
             timeout=self._config.timeout_seconds,
         )
         response.raise_for_status()
-        payload = response.json()
-        if isinstance(payload, dict) and "data" in payload:
-            return list(payload["data"])
-        if isinstance(payload, list):
-            return payload
-        raise ValueError("Unexpected response from /api/ciphers")
+        return self._ciphers_from_payload(_loads(response.content))
+
+    def iter_ciphers(self) -> Iterator[Dict[str, Any]]:
+        """Yield ciphers one at a time, streaming the response when ijson is available."""
+
+        if ijson is None:
+            yield from self.list_ciphers()
+            return
+
+        self._ensure_token()
+        with self._session.get(
+            self._url_ciphers,
+            timeout=self._config.timeout_seconds,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            raw = response.raw
+            raw.decode_content = True  # let urllib3 undo gzip/deflate
+            # Peek at the first token to tell the {"data": [...]} envelope from a bare list.
+            head = b""
+            while True:
+                chunk = raw.read(64)
+                if not chunk:
+                    break
+                head += chunk
+                if head.lstrip():
+                    break
+            stripped = head.lstrip()
+            if not stripped:
+                raise ValueError("Unexpected response from /api/ciphers")
+            array_prefix = "" if stripped[:1] == b"[" else "data"
+            seen_array = False
+
+            def events() -> Iterator[Tuple[str, str, Any]]:
+                nonlocal seen_array
+                for prefix, event, value in ijson.parse(_PrefixedReader(head, raw), use_float=True):
+                    if event == "start_array" and prefix == array_prefix:
+                        seen_array = True
+                    yield prefix, event, value
+
+            item_prefix = f"{array_prefix}.item" if array_prefix else "item"
+            yield from ijson.items(events(), item_prefix)
+            # Same contract as list_ciphers: a body without the cipher array is an error,
+            # not an empty vault.
+            if not seen_array:
+                raise ValueError("Unexpected response from /api/ciphers")
 
     def get_profile(self) -> Dict[str, Any]:
         if self._profile_cache is None:
+            self._ensure_token()
             response = self._session.get(
-                urljoin(self._base_url + "/", "api/accounts/profile"),
-                headers=self._auth_headers(),
+                self._url_profile,
                 timeout=self._config.timeout_seconds,
             )
             response.raise_for_status()
-            self._profile_cache = response.json()
+            self._profile_cache = _loads(response.content)
         return self._profile_cache
 
     def resolve_user_email(self, user_id: Optional[str]) -> Optional[str]:
         """Resolve a Vaultwarden user id to an email address."""
 
-        if not user_id:
-            profile = self.get_profile()
-            return profile.get("email")
-
-        if user_id in self._user_email_cache:
-            return self._user_email_cache[user_id]
-
-        # Fallback strategy: try organization members endpoint if org context present
-        # This keeps the client usable without needing every upstream change immediately.
+        # The profile is memoized; fetch it once and reuse it for every fallback below.
         profile = self.get_profile()
-        org_id = profile.get("organizationId")
-        if org_id:
-            response = self._session.get(
-                urljoin(self._base_url + "/", f"api/organizations/{org_id}/users"),
-                headers=self._auth_headers(),
-                timeout=self._config.timeout_seconds,
-            )
-            if response.status_code == 200:
-                for entry in response.json().get("data", []):
-                    if entry.get("id") == user_id:
-                        email = entry.get("email")
-                        if email:
-                            self._user_email_cache[user_id] = email
-                            return email
+        email, org_id = self._email_before_roster(profile, user_id)
+        if org_id is None:
+            return email
+        return self._email_from_roster(profile, user_id, self._get_org_users(org_id))
 
-        # As a final fallback return profile email to avoid dropping notifications entirely.
-        return profile.get("email")
+    def _get_org_users(self, org_id: str) -> Optional[Dict[str, str]]:
+        """Return the organization's ``{user_id: email}`` map, memoized for a few minutes."""
+
+        users = self._cached_org_users(org_id)
+        if users is not None:
+            return users
+        self._ensure_token()
+        response = self._session.get(
+            self._url_org_users(org_id),
+            timeout=self._config.timeout_seconds,
+        )
+        if response.status_code != 200:
+            return None
+        return self._store_org_users(org_id, _loads(response.content))
 
     def update_cipher_password(self, cipher_id: str, new_password: str) -> Dict[str, Any]:
         payload = {"password": new_password}
+        self._ensure_token()
         response = self._session.put(
-            urljoin(self._base_url + "/", f"api/ciphers/{cipher_id}/password"),
-            headers=self._auth_headers(),
+            self._url_cipher_password(cipher_id),
             json=payload,
             timeout=self._config.timeout_seconds,
         )
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
+
+
+class AsyncVaultwardenClient(_VaultwardenAPIMixin):
+    """``asyncio`` counterpart of :class:`VaultwardenClient` built on ``httpx``.
+
+    The underlying ``httpx.AsyncClient`` is bound to an event loop, so it is opened
+    on ``async with`` and closed again on exit; token and cache state survive
+    between runs. :meth:`flush_cache` blocks on file I/O.
+    """
+
+    def __init__(self, config: VaultwardenConfig) -> None:
+        try:
+            import httpx
+        except ImportError as exc:  # pragma: no cover - import failure path
+            raise RuntimeError("httpx is required for the async Vaultwarden client") from exc
+
+        super().__init__(config)
+        self._httpx = httpx
+        self._http: Optional[Any] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._roster_lock: Optional[asyncio.Lock] = None
+        self._profile_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncVaultwardenClient":
+        httpx = self._httpx
+        self._http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+            timeout=self._config.timeout_seconds,
+            headers={"User-Agent": USER_AGENT},
+        )
+        if self._token:
+            # Carry a still-valid token over from the previous run's client.
+            self._http.headers["Authorization"] = f"Bearer {self._token}"
+        self._token_lock = asyncio.Lock()
+        self._roster_lock = asyncio.Lock()
+        self._profile_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
 
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._token_lock = self._roster_lock = self._profile_lock = None
 
-@dataclass
+    def _client(self) -> Any:
+        if self._http is None:
+            raise RuntimeError(_NOT_OPEN)
+        return self._http
+
+    @staticmethod
+    def _lock(lock: Optional[asyncio.Lock]) -> asyncio.Lock:
+        # Locks only exist between __aenter__ and aclose, like the httpx client.
+        if lock is None:
+            raise RuntimeError(_NOT_OPEN)
+        return lock
+
+    # ---- authentication helpers -------------------------------------------------
+    async def _obtain_token(self) -> None:
+        http = self._client()
+        data = self._token_form(http.headers)
+        response = await http.post(
+            self._url_token,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data=data,
+        )
+        response.raise_for_status()
+        self._store_token(_loads(response.content), http.headers)
+
+    async def _ensure_token(self) -> None:
+        if not self._token_is_valid():
+            # Concurrent callers share a single token request.
+            async with self._lock(self._token_lock):
+                if not self._token_is_valid():
+                    await self._obtain_token()
+
+    # ---- public API --------------------------------------------------------------
+    async def list_ciphers(self) -> List[Dict[str, Any]]:
+        await self._ensure_token()
+        response = await self._client().get(
+            self._url_ciphers,
+        )
+        response.raise_for_status()
+        return self._ciphers_from_payload(_loads(response.content))
+
+    async def get_profile(self) -> Dict[str, Any]:
+        if self._profile_cache is None:
+            # Concurrent first callers share a single profile request.
+            async with self._lock(self._profile_lock):
+                if self._profile_cache is None:
+                    await self._ensure_token()
+                    response = await self._client().get(self._url_profile)
+                    response.raise_for_status()
+                    self._profile_cache = _loads(response.content)
+        return self._profile_cache
+
+    async def resolve_user_email(self, user_id: Optional[str]) -> Optional[str]:
+        """Resolve a Vaultwarden user id to an email address."""
+
+        # The profile is memoized; fetch it once and reuse it for every fallback below.
+        profile = await self.get_profile()
+        email, org_id = self._email_before_roster(profile, user_id)
+        if org_id is None:
+            return email
+        return self._email_from_roster(profile, user_id, await self._get_org_users(org_id))
+
+    async def _get_org_users(self, org_id: str) -> Optional[Dict[str, str]]:
+        """Return the organization's ``{user_id: email}`` map, memoized for a few minutes."""
+
+        # Serialize so a burst of concurrent lookups shares one roster fetch.
+        async with self._lock(self._roster_lock):
+            users = self._cached_org_users(org_id)
+            if users is not None:
+                return users
+            await self._ensure_token()
+            response = await self._client().get(
+                self._url_org_users(org_id),
+            )
+            if response.status_code != 200:
+                return None
+            return self._store_org_users(org_id, _loads(response.content))
+
+    async def update_cipher_password(self, cipher_id: str, new_password: str) -> Dict[str, Any]:
+        payload = {"password": new_password}
+        await self._ensure_token()
+        response = await self._client().put(
+            self._url_cipher_password(cipher_id),
+            json=payload,
+        )
+        response.raise_for_status()
+        return _loads(response.content)
+
+
+@dataclass(slots=True)
 class CipherSelection:
     """Represents a filtered selection of ciphers."""
 
     items: List[Dict[str, Any]]
 
     def filter_collections(self, collection_ids: Iterable[str]) -> "CipherSelection":
-        collection_ids = set(collection_ids)
-        filtered = []
-        for cipher in self.items:
-            cid = cipher.get("collectionId")
-            if cid and cid in collection_ids:
-                filtered.append(cipher)
-                continue
-            multi = cipher.get("collectionIds")
-            if isinstance(multi, IterableABC) and any(str(m) in collection_ids for m in multi):
-                filtered.append(cipher)
+        collection_ids = frozenset(map(str, collection_ids))
+        filtered = [c for c in self.items if self.in_collections(c, collection_ids)]
         return CipherSelection(filtered)
 
+    @staticmethod
+    def in_collections(cipher: Dict[str, Any], collection_ids: "frozenset[str]") -> bool:
+        """Return True if the cipher belongs to any of ``collection_ids`` (string ids)."""
+
+        cid = cipher.get("collectionId")
+        if cid is not None and str(cid) in collection_ids:
+            return True
+        multi = cipher.get("collectionIds")
+        if not multi or isinstance(multi, (str, bytes)) or not isinstance(multi, IterableABC):
+            return False
+        # Vaultwarden sends string ids, so usually the list can be handed to the C-level
+        # isdisjoint (which stops at the first shared id) without a str() pass.
+        if isinstance(multi, (list, tuple)) and isinstance(multi[0], str):
+            return not collection_ids.isdisjoint(multi)
+        return not collection_ids.isdisjoint(map(str, multi))
+
     def filter_users(self, user_ids: Iterable[str]) -> "CipherSelection":
         user_ids = set(user_ids)
         filtered = [c for c in self.items if c.get("userId") in user_ids]
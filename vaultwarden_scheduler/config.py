@@ -7,7 +7,7 @@ from datetime import timedelta
 from typing import Optional, Sequence
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VaultwardenConfig:
     """Connection details for talking to Vaultwarden's HTTP API."""
 
@@ -18,7 +18,7 @@ class VaultwardenConfig:
     audience: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RotationPolicy:
     """Defines when an item becomes due for password rotation."""
 
@@ -35,7 +35,7 @@ class RotationPolicy:
         return timedelta(days=self.grace_period_days)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NotificationConfig:
     """Configuration for outbound SNS notifications."""
 
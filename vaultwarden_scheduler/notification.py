@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures
+import io
 from dataclasses import dataclass
 from datetime import timezone
-from typing import List, Optional, Sequence, TYPE_CHECKING
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
 import os
+import random
 import time
 
 from .config import NotificationConfig
@@ -13,41 +17,185 @@ from .config import NotificationConfig
 if TYPE_CHECKING:  # pragma: no cover
     from .scheduler import RotationCandidate
 
+_DUE_FMT = "%Y-%m-%d %H:%M UTC"
+_BODY_HEADER = """Hello,
 
-@dataclass(frozen=True)
+The following Vaultwarden entries are due for password rotation:
+
+"""
+_BODY_FOOTER = """
+Please rotate these passwords at your earliest convenience.
+If you have already updated them, you can ignore this reminder.
+
+— Vaultwarden"""
+
+
+@dataclass(frozen=True, slots=True)
 class NotificationResult:
     """Represents a successfully queued email notification."""
     recipient: str
     message_id: str
 
 
-class AWSSNSNotifier:
+class _SNSMessageMixin:
+    """Subject/body formatting and retry policy shared by the sync and async SNS notifiers."""
+
+    # SNS error codes worth retrying with backoff; anything else is re-raised immediately.
+    _RETRYABLE_CODES = frozenset(
+        {
+            "Throttling",
+            "ThrottlingException",
+            "InternalError",
+            "InternalFailure",
+            "ServiceUnavailable",
+            "RequestTimeout",
+        }
+    )
+    # botocore retry policy for clients the notifiers build themselves (5 calls in total).
+    _BOTOCORE_RETRIES = {"total_max_attempts": 5, "mode": "adaptive"}
+
+    def __init__(self, config: NotificationConfig) -> None:
+        self._config = config
+        # Message settings are read once per notifier instead of once per message.
+        self._max_lines = int(os.getenv("ROTATION_SNS_MAX_LINES", "100"))
+        self._vault_base = os.getenv("VAULTWARDEN_URL", "").strip()
+
+    def _subject(self) -> str:
+        subject_prefix = (self._config.subject_prefix or "Vaultwarden").encode("ascii", "ignore").decode("ascii")
+        return f"{subject_prefix} password rotation reminder"[:100]  # SNS Subject must be ASCII, <= 100 chars
+
+    @staticmethod
+    def _error_code(exc: BaseException) -> Optional[str]:
+        response = getattr(exc, "response", None)
+        return response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+
+    @staticmethod
+    def _backoff_seconds(attempt: int) -> float:
+        # 1,2,4,8 seconds plus jitter so recipients throttled together don't retry in lockstep
+        return 2 ** attempt + random.random()
+
+    @staticmethod
+    def _message_attributes(recipient: str) -> Dict[str, Dict[str, str]]:
+        return {"recipient": {"DataType": "String", "StringValue": recipient}}
+
+    @staticmethod
+    def _client_kwargs(config: NotificationConfig) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"region_name": config.region}
+        if config.access_key and config.secret_key:
+            kwargs.update(
+                aws_access_key_id=config.access_key,
+                aws_secret_access_key=config.secret_key,
+            )
+        endpoint_url = os.getenv("AWS_ENDPOINT_URL")  # e.g. http://localhost:4566 for LocalStack
+        if endpoint_url:
+            kwargs["endpoint_url"] = endpoint_url
+        return kwargs
+
+    # ---------- Email body helpers ----------
+
+    def _build_plaintext_body(
+        self,
+        recipient: str,
+        items: Sequence["RotationCandidate"],
+        policy_summary: str,
+    ) -> str:
+        max_lines = self._max_lines
+        # Links look like "http://localhost:3000/#/vault?itemId=<id>"
+        base_url = self._vault_base.rstrip("/")
+        utc = timezone.utc
+
+        buf = io.StringIO()
+        w = buf.write
+        w(_BODY_HEADER)
+
+        for i, candidate in enumerate(items):
+            if i >= max_lines:
+                w(f"... and {len(items) - max_lines} more\n")
+                break
+
+            due = candidate.due_at
+            if due.tzinfo is not utc:
+                due = due.astimezone(utc)
+            due_str = due.strftime(_DUE_FMT)
+
+            label = self._label_for(candidate)
+            full_id = candidate.item.id or "unknown-id"
+
+            w(f"- {label} (due {due_str})\n  ID: {full_id}\n")
+            if base_url and full_id != "unknown-id":
+                w(f"  Link: {base_url}/#/vault?itemId={full_id}\n")
+
+        w(f"\nPolicy: {policy_summary}\n")
+        w(_BODY_FOOTER)
+        return buf.getvalue()
+
+    @staticmethod
+    def _looks_encrypted(s: Optional[str]) -> bool:
+        # Typical encrypted shape: "<encType>.<b64>|<b64>|<b64>" and quite long
+        if not s:
+            return False
+        return ("|" in s and "." in s) or len(s) > 60
+
+    @staticmethod
+    def _type_label(candidate: "RotationCandidate") -> str:
+        # Unknown or missing cipher types fall back to a generic "Item"
+        TYPE_LABEL = {1: "Login", 2: "SecureNote", 3: "Card", 4: "Identity"}
+        return TYPE_LABEL.get(candidate.item.cipher_type, "Item")
+
+    def _label_for(self, candidate: "RotationCandidate") -> str:
+        name = getattr(candidate.item, "name", "") or "(Unnamed)"
+        if self._looks_encrypted(name):
+            short_id = (candidate.item.id or "")[:8] or "unknown"
+            return f"({self._type_label(candidate)}) ID:{short_id}"
+        return name
+
+
+class AWSSNSNotifier(_SNSMessageMixin):
     """Wrapper around AWS SNS for distributing rotation reminders."""
 
     def __init__(self, config: NotificationConfig, sns_client: Optional[object] = None) -> None:
-        self._config = config
+        super().__init__(config)
+        workers = int(os.getenv("ROTATION_SNS_WORKERS", "8"))
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="sns-publish"
+        )
         if sns_client is not None:
             self._sns = sns_client
             self._client_error_cls = Exception  # fallback
+            self._max_attempts = 5
         else:
             try:
                 import boto3
+                from botocore.config import Config
                 from botocore.exceptions import ClientError
                 self._client_error_cls = ClientError
             except ImportError as exc:  # pragma: no cover - import failure path
                 raise RuntimeError("boto3 is required for AWS SNS notifications") from exc
 
-            session_kwargs = {"region_name": config.region}
-            if config.access_key and config.secret_key:
-                session_kwargs.update(
-                    aws_access_key_id=config.access_key,
-                    aws_secret_access_key=config.secret_key,
-                )
-            endpoint_url = os.getenv("AWS_ENDPOINT_URL")  # e.g. http://localhost:4566 for LocalStack
-            if endpoint_url:
-                self._sns = boto3.client("sns", endpoint_url=endpoint_url, **session_kwargs)
-            else:
-                self._sns = boto3.client("sns", **session_kwargs)
+            # One pooled connection per worker; botocore's adaptive mode handles throttling
+            # and transient errors, so our own loop only makes a single attempt.
+            boto_config = Config(
+                max_pool_connections=workers,
+                retries=dict(self._BOTOCORE_RETRIES),
+            )
+            self._sns = boto3.client("sns", config=boto_config, **self._client_kwargs(config))
+            self._max_attempts = 1
+
+    def close(self) -> None:
+        """Stop the publish worker threads."""
+
+        self._executor.shutdown(wait=True)
+
+    def send_rotation_notice_batch(
+        self,
+        pairs: Iterable[Tuple[str, Sequence["RotationCandidate"]]],
+        policy_summary: str,
+    ) -> List[NotificationResult]:
+        """Publish one notice per ``(recipient, items)`` pair on the worker pool."""
+
+        return list(
+            self._executor.map(lambda rp: self.send_rotation_notice(rp[0], rp[1], policy_summary), pairs)
+        )
 
     def send_rotation_notice(
         self,
@@ -57,17 +205,15 @@ class AWSSNSNotifier:
     ) -> NotificationResult:
         """Publish a rotation reminder message to the configured SNS topic."""
 
-        subject_prefix = (self._config.subject_prefix or "Vaultwarden").encode("ascii", "ignore").decode("ascii")
-        subject = f"{subject_prefix} password rotation reminder"[:100]  # SNS Subject must be ASCII, <= 100 chars
+        subject = self._subject()
         body_text = self._build_plaintext_body(recipient, items, policy_summary)
+        message_attributes = self._message_attributes(recipient)
 
-        message_attributes = {
-            "recipient": {"DataType": "String", "StringValue": recipient}
-        }
-
-        # Simple retry/backoff for throttling & transient errors
+        # Simple retry/backoff for throttling & transient errors (injected clients only;
+        # clients built here rely on botocore's adaptive retries)
         last_exc: Optional[Exception] = None
-        for attempt in range(5):
+        last_attempt = self._max_attempts - 1
+        for attempt in range(self._max_attempts):
             try:
                 response = self._sns.publish(
                     TopicArn=self._config.topic_arn,
@@ -79,15 +225,14 @@ class AWSSNSNotifier:
                 return NotificationResult(recipient=recipient, message_id=message_id)
             except self._client_error_cls as e:  # type: ignore
                 # On throttling / 5xx, backoff; otherwise re-raise
-                code = getattr(e, "response", {}).get("Error", {}).get("Code")
-                if code in {"Throttling", "InternalError", "ServiceUnavailable"} and attempt < 4:
-                    time.sleep(2 ** attempt)  # 1,2,4,8 seconds
+                if self._error_code(e) in self._RETRYABLE_CODES and attempt < last_attempt:
+                    time.sleep(self._backoff_seconds(attempt))
                     last_exc = e
                     continue
                 raise
             except Exception as e:
-                if attempt < 4:
-                    time.sleep(2 ** attempt)
+                if attempt < last_attempt:
+                    time.sleep(self._backoff_seconds(attempt))
                     last_exc = e
                     continue
                 raise
@@ -96,77 +241,88 @@ class AWSSNSNotifier:
             raise last_exc
         return NotificationResult(recipient=recipient, message_id="")
 
-    # ---------- Email body helpers ----------
-
-    def _build_plaintext_body(
-        self,
-        recipient: str,
-        items: Sequence["RotationCandidate"],
-        policy_summary: str,
-    ) -> str:
-        max_lines = int(os.getenv("ROTATION_SNS_MAX_LINES", "100"))
-        base_url = os.getenv("VAULTWARDEN_URL", "").strip()
 
-        lines: List[str] = [
-            "Hello,",
-            "",
-            "The following Vaultwarden entries are due for password rotation:",
-            "",
-        ]
+class AsyncAWSSNSNotifier(_SNSMessageMixin):
+    """``asyncio`` variant of :class:`AWSSNSNotifier` backed by aiobotocore.
 
-        for i, candidate in enumerate(items):
-            if i >= max_lines:
-                lines.append(f"... and {len(items) - max_lines} more")
-                break
+    Use as ``async with notifier:``; the SNS client lives for the duration of the block.
+    """
 
-            due_utc = candidate.due_at.astimezone(timezone.utc)
-            due_str = due_utc.strftime("%Y-%m-%d %H:%M UTC")
+    def __init__(self, config: NotificationConfig, sns_client: Optional[object] = None) -> None:
+        super().__init__(config)
+        self._session: Optional[Any] = None
+        self._client_ctx: Optional[Any] = None
+        self._sns: Optional[Any] = sns_client
+        self._boto_config: Optional[Any] = None
+        if sns_client is not None:
+            self._client_error_cls = Exception  # fallback
+            self._max_attempts = 5
+        else:
+            try:
+                from aiobotocore.session import get_session
+                from botocore.config import Config
+                from botocore.exceptions import ClientError
+                self._client_error_cls = ClientError
+            except ImportError as exc:  # pragma: no cover - import failure path
+                raise RuntimeError("aiobotocore is required for async AWS SNS notifications") from exc
+            self._session = get_session()
+            # Same policy as the sync notifier: botocore retries, our loop tries once.
+            self._boto_config = Config(retries=dict(self._BOTOCORE_RETRIES))
+            self._max_attempts = 1
 
-            label = self._label_for(candidate)
-            full_id = candidate.item.id or "unknown-id"
+    async def __aenter__(self) -> "AsyncAWSSNSNotifier":
+        if self._session is not None and self._client_ctx is None:
+            self._client_ctx = self._session.create_client(
+                "sns", config=self._boto_config, **self._client_kwargs(self._config)
+            )
+            self._sns = await self._client_ctx.__aenter__()
+        return self
 
-            lines.append(f"- {label} (due {due_str})")
-            lines.append(f"  ID: {full_id}")
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._client_ctx is not None:
+            ctx, self._client_ctx, self._sns = self._client_ctx, None, None
+            await ctx.__aexit__(*exc_info)
 
-            if base_url and full_id != "unknown-id":
-                lines.append(f"  Link: {self._item_link(base_url, full_id)}")
-
-        lines.extend(
-            [
-                "",
-                f"Policy: {policy_summary}",
-                "",
-                "Please rotate these passwords at your earliest convenience.",
-                "If you have already updated them, you can ignore this reminder.",
-                "",
-                "— Vaultwarden",
-            ]
-        )
-        return "\n".join(lines)
+    async def send_rotation_notice(
+        self,
+        recipient: str,
+        items: Sequence["RotationCandidate"],
+        policy_summary: str,
+    ) -> NotificationResult:
+        """Publish a rotation reminder message to the configured SNS topic."""
 
-    @staticmethod
-    def _item_link(base_url: str, item_id: str) -> str:
-        # base_url like "http://localhost:3000" -> "http://localhost:3000/#/vault?itemId=<id>"
-        base = base_url.rstrip("/")
-        return f"{base}/#/vault?itemId={item_id}"
+        if self._sns is None:
+            raise RuntimeError("AsyncAWSSNSNotifier must be used inside 'async with'")
 
-    @staticmethod
-    def _looks_encrypted(s: Optional[str]) -> bool:
-        # Typical encrypted shape: "<encType>.<b64>|<b64>|<b64>" and quite long
-        if not s:
-            return False
-        return ("|" in s and "." in s) or len(s) > 60
-
-    @staticmethod
-    def _type_label(candidate: "RotationCandidate") -> str:
-        # If you added cipher_type to VaultItem, show a type; otherwise generic "Item"
-        TYPE_LABEL = {1: "Login", 2: "SecureNote", 3: "Card", 4: "Identity"}
-        t = getattr(candidate.item, "cipher_type", None)
-        return TYPE_LABEL.get(t, "Item")
+        subject = self._subject()
+        body_text = self._build_plaintext_body(recipient, items, policy_summary)
+        message_attributes = self._message_attributes(recipient)
 
-    def _label_for(self, candidate: "RotationCandidate") -> str:
-        name = getattr(candidate.item, "name", "") or "(Unnamed)"
-        if self._looks_encrypted(name):
-            short_id = (candidate.item.id or "")[:8] or "unknown"
-            return f"({self._type_label(candidate)}) ID:{short_id}"
-        return name
+        # Manual backoff only for injected clients; see __init__.
+        last_exc: Optional[Exception] = None
+        last_attempt = self._max_attempts - 1
+        for attempt in range(self._max_attempts):
+            try:
+                response = await self._sns.publish(
+                    TopicArn=self._config.topic_arn,
+                    Subject=subject,
+                    Message=body_text,
+                    MessageAttributes=message_attributes,
+                )
+                message_id = response.get("MessageId", "")
+                return NotificationResult(recipient=recipient, message_id=message_id)
+            except self._client_error_cls as e:  # type: ignore
+                if self._error_code(e) in self._RETRYABLE_CODES and attempt < last_attempt:
+                    await asyncio.sleep(self._backoff_seconds(attempt))
+                    last_exc = e
+                    continue
+                raise
+            except Exception as e:
+                if attempt < last_attempt:
+                    await asyncio.sleep(self._backoff_seconds(attempt))
+                    last_exc = e
+                    continue
+                raise
+        if last_exc:
+            raise last_exc
+        return NotificationResult(recipient=recipient, message_id="")
@@ -2,19 +2,38 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
+import inspect
+import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 # NEW: for digest mode + dedupe
 import os
+import re
 import json
 import hashlib
 import pathlib
 
-from .client import VaultwardenClient, CipherSelection
+from .client import AsyncVaultwardenClient, VaultwardenClient, CipherSelection
 from .config import RotationPolicy
 
+LOGGER = logging.getLogger("vaultwarden_scheduler.scheduler")
+
+# Upper bound on in-flight Vaultwarden requests issued by the async paths.
+ASYNC_CONCURRENCY = 8
+# Upper bound on in-flight SNS publishes, to stay under the per-second quota.
+SNS_PUBLISH_CONCURRENCY = 10
+
+
+# Vaultwarden emits ISO-8601 with up to 7 fractional digits (.NET ticks) and a "Z" suffix.
+_ISO_RE = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+\-]\d{2}:?\d{2})?$"
+)
+
 
 def _parse_timestamp(raw: Optional[str]) -> Optional[datetime]:
     if not raw:
@@ -22,27 +41,39 @@ def _parse_timestamp(raw: Optional[str]) -> Optional[datetime]:
     value = raw.strip()
     if not value:
         return None
+    match = _ISO_RE.match(value)
+    if match is not None:
+        year, month, day, hour, minute, second, fraction, offset = match.groups()
+        if not offset or offset == "Z":
+            tzinfo = timezone.utc
+        else:
+            sign = -1 if offset[0] == "-" else 1
+            digits = offset[1:].replace(":", "")
+            tzinfo = timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+        try:
+            return datetime(
+                int(year),
+                int(month),
+                int(day),
+                int(hour),
+                int(minute),
+                int(second),
+                int((fraction or "0").ljust(6, "0")[:6]),
+                tzinfo=tzinfo,
+            )
+        except ValueError:
+            return None
+    # Uncommon shapes (date-only, week dates, ...) go through the stdlib parser.
     if value.endswith("Z"):
         value = value[:-1] + "+00:00"
     try:
-        return datetime.fromisoformat(value)
+        parsed = datetime.fromisoformat(value)
     except ValueError:
-        pass
-    formats = [
-        "%Y-%m-%dT%H:%M:%S.%f",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%d %H:%M:%S",
-    ]
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(value, fmt)
-            return dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            continue
-    return None
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VaultItem:
     """Metadata the scheduler cares about for a Vaultwarden cipher."""
 
@@ -52,6 +83,7 @@ class VaultItem:
     collection_ids: Sequence[str]
     revision_date: datetime
     last_rotated_at: Optional[datetime]
+    cipher_type: Optional[int] = None
 
     @property
     def effective_rotation_source(self) -> datetime:
@@ -62,6 +94,7 @@ class VaultItem:
         cipher_id = str(payload.get("id"))
         name = str(payload.get("name") or payload.get("organizationId") or "Unnamed entry")
         user_id = payload.get("userId")
+        cipher_type = payload.get("type")
         revision = _parse_timestamp(str(payload.get("revisionDate", ""))) or datetime.now(timezone.utc)
         last_rotated = _parse_timestamp(str(payload.get("passwordRotation")))
         if not last_rotated:
@@ -79,10 +112,11 @@ class VaultItem:
             collection_ids=collection_ids,
             revision_date=revision,
             last_rotated_at=last_rotated,
+            cipher_type=cipher_type if isinstance(cipher_type, int) else None,
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RotationCandidate:
     """Represents an item that is due (or nearly due) for rotation."""
 
@@ -105,87 +139,285 @@ class PasswordRotationScheduler:
         notifier,
         now_factory: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
         user_email_resolver: Optional[Callable[[VaultItem], Optional[str]]] = None,
+        async_client: Optional[AsyncVaultwardenClient] = None,
     ) -> None:
         self._client = client
         self._policy = policy
         self._notifier = notifier
         self._now_factory = now_factory
+        self._custom_resolver = user_email_resolver is not None
         self._user_email_resolver = user_email_resolver or self._resolve_email_via_client
+        self._async_client = async_client
+        self._collection_filter = frozenset(map(str, policy.target_collections or ()))
+        self._user_filter = frozenset(policy.target_users or ())
+        self._state_mtime: Optional[float] = None
+        self._state_hash: Optional[str] = None
 
     def run_once(self, send_notifications: bool = True) -> List[RotationCandidate]:
-        ciphers = self._client.list_ciphers()
-        selection = CipherSelection(ciphers)
-        if self._policy.target_collections:
-            selection = selection.filter_collections(self._policy.target_collections)
-        if self._policy.target_users:
-            selection = selection.filter_users(self._policy.target_users)
+        if self._async_client is not None:
+            return asyncio.run(self.run_once_async(send_notifications=send_notifications))
 
-        items = [VaultItem.from_api(payload) for payload in selection.items]
-        candidates = self._select_due_items(items)
-        if send_notifications and candidates:
-            self._dispatch_notifications(candidates)
+        try:
+            items = self._build_items(self._client.iter_ciphers())
+            candidates = self._select_due_items(items)
+            if send_notifications and candidates:
+                self._dispatch_notifications(candidates)
+        finally:
+            self._flush_client_cache(self._client)
         return candidates
 
+    async def run_once_async(self, send_notifications: bool = True) -> List[RotationCandidate]:
+        """Same as :meth:`run_once`, but overlaps the per-candidate network calls."""
+
+        if self._async_client is None:
+            raise RuntimeError("run_once_async requires an AsyncVaultwardenClient")
+
+        try:
+            async with self._async_client:
+                ciphers = await self._async_client.list_ciphers()
+                items = self._build_items(ciphers)
+                candidates = self._select_due_items(items)
+                if send_notifications and candidates:
+                    await self._dispatch_notifications_async(candidates)
+        finally:
+            # File I/O and flock stay off the event loop.
+            await asyncio.to_thread(self._flush_client_cache, self._async_client)
+        return candidates
+
+    async def apply_rotations_async(self, new_passwords: Mapping[str, str]) -> List[Dict[str, Any]]:
+        """Push new passwords (cipher id -> password) concurrently."""
+
+        if self._async_client is None:
+            raise RuntimeError("apply_rotations_async requires an AsyncVaultwardenClient")
+
+        client = self._async_client
+        sem = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+        async def update(cipher_id: str, password: str) -> Dict[str, Any]:
+            async with sem:
+                return await client.update_cipher_password(cipher_id, password)
+
+        async with client:
+            return list(await asyncio.gather(*[update(cid, pw) for cid, pw in new_passwords.items()]))
+
+    def close(self) -> None:
+        """Release resources held by the client and notifier (connection pools, workers)."""
+
+        for resource in (self._client, self._notifier):
+            close = getattr(resource, "close", None)
+            if callable(close):
+                close()
+
     # ---- helpers ----------------------------------------------------------------
+    @staticmethod
+    def _flush_client_cache(client: Any) -> None:
+        # Persist lookups once per run rather than once per resolved user.
+        flush = getattr(client, "flush_cache", None)
+        if callable(flush):
+            flush()
+
+    def _build_items(self, ciphers: Iterable[Dict[str, Any]]) -> List[VaultItem]:
+        # Single fused pass: filter and convert without intermediate CipherSelection lists.
+        col_set = self._collection_filter
+        user_set = self._user_filter
+        in_collections = CipherSelection.in_collections
+        from_api = VaultItem.from_api
+        items: List[VaultItem] = []
+        append = items.append
+        for cipher in ciphers:
+            if col_set and not in_collections(cipher, col_set):
+                continue
+            if user_set and cipher.get("userId") not in user_set:
+                continue
+            append(from_api(cipher))
+        return items
+
     def _select_due_items(self, items: Iterable[VaultItem]) -> List[RotationCandidate]:
         now = self._now_factory()
         due_items: List[RotationCandidate] = []
         frequency = self._policy.frequency_delta()
         grace = self._policy.grace_delta()
         reminder_threshold = frequency - grace
+        # now >= reference + threshold  <=>  reference <= now - threshold
+        cutoff = now - reminder_threshold
 
+        candidate_cls = RotationCandidate
+        append = due_items.append
         for item in items:
             reference = item.effective_rotation_source
-            due_at = reference + frequency
             # Send reminders when within reminder window or overdue
-            if now >= reference + reminder_threshold:
-                due_items.append(RotationCandidate(item=item, due_at=due_at))
+            if reference <= cutoff:
+                append(candidate_cls(item=item, due_at=reference + frequency))
         return due_items
 
     def _dispatch_notifications(self, candidates: Sequence[RotationCandidate]) -> None:
         if not candidates:
             return
 
+        notifier_is_async = self._notifier_is_async()
+
         # SNS-only friendly: default to a single digest message per run.
         if os.getenv("ROTATION_SNS_DIGEST", "1").lower() in {"1", "true", "yes", "on"}:
             if not self._digest_has_changed(candidates):
                 # No change since last run; avoid duplicate emails
                 return
             policy_summary = self.build_policy_summary()
+            if notifier_is_async:
+                asyncio.run(self._publish_async([("all", list(candidates))], policy_summary))
+                return
             self._notifier.send_rotation_notice("all", list(candidates), policy_summary)
             return
 
-        # Fallback: per-recipient grouping (useful if later routing via Lambda/SES)
+        # Fallback: per-recipient grouping (useful if later routing via Lambda/SES).
+        # Resolution stays on this thread: VaultwardenClient is not thread-safe.
+        grouped = self._group_by_recipient(candidates)
+        if not grouped:
+            return
+
+        policy_summary = self.build_policy_summary()
+        if notifier_is_async:
+            # Only the publishes are overlapped.
+            asyncio.run(self._publish_async(list(grouped.items()), policy_summary))
+            return
+        send_batch = getattr(self._notifier, "send_rotation_notice_batch", None)
+        if callable(send_batch):
+            send_batch(list(grouped.items()), policy_summary)
+            return
+        for recipient, items in grouped.items():
+            self._notifier.send_rotation_notice(recipient, items, policy_summary)
+
+    async def _dispatch_notifications_async(self, candidates: Sequence[RotationCandidate]) -> None:
+        if not candidates:
+            return
+
+        if os.getenv("ROTATION_SNS_DIGEST", "1").lower() in {"1", "true", "yes", "on"}:
+            if not self._digest_has_changed(candidates):
+                return
+            policy_summary = self.build_policy_summary()
+            await self._publish_async([("all", list(candidates))], policy_summary)
+            return
+
+        if self._async_client is not None and not self._custom_resolver:
+            client = self._async_client
+            sem = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+            async def resolve(user_id: Optional[str]) -> Optional[str]:
+                async with sem:
+                    return await client.resolve_user_email(user_id)
+
+            user_ids = list(dict.fromkeys(candidate.item.user_id for candidate in candidates))
+            emails = await asyncio.gather(*[resolve(uid) for uid in user_ids])
+            by_user = dict(zip(user_ids, emails))
+            grouped: Dict[str, List[RotationCandidate]] = {}
+            for candidate in candidates:
+                email = by_user[candidate.item.user_id]
+                if email:
+                    grouped.setdefault(email, []).append(candidate)
+        else:
+            # Custom resolvers make no thread-safety promises; call them in order.
+            grouped = self._group_by_recipient(candidates)
+
+        if not grouped:
+            return
+
+        policy_summary = self.build_policy_summary()
+        await self._publish_async(list(grouped.items()), policy_summary)
+
+    def _group_by_recipient(self, candidates: Sequence[RotationCandidate]) -> Dict[str, List[RotationCandidate]]:
         grouped: Dict[str, List[RotationCandidate]] = {}
+        # The default resolver only looks at user_id, so resolve each user once.
+        by_user: Dict[Optional[str], Optional[str]] = {}
         for candidate in candidates:
-            email = self._user_email_resolver(candidate.item)
+            if self._custom_resolver:
+                email = self._user_email_resolver(candidate.item)
+            else:
+                user_id = candidate.item.user_id
+                if user_id not in by_user:
+                    by_user[user_id] = self._user_email_resolver(candidate.item)
+                email = by_user[user_id]
             if not email:
                 continue
             grouped.setdefault(email, []).append(candidate)
+        return grouped
 
-        if not grouped:
-            return
+    async def _publish_async(
+        self,
+        pairs: List[Tuple[str, List[RotationCandidate]]],
+        policy_summary: str,
+    ) -> None:
+        """Gather one publish per ``(recipient, items)`` pair, bounded by the SNS quota."""
 
-        policy_summary = self.build_policy_summary()
-        for recipient, items in grouped.items():
-            self._notifier.send_rotation_notice(recipient, items, policy_summary)
+        publish_sem = asyncio.Semaphore(SNS_PUBLISH_CONCURRENCY)
+
+        async def notify(recipient: str, items: List[RotationCandidate]) -> Any:
+            async with publish_sem:
+                return await self._send_notice_async(recipient, items, policy_summary)
+
+        async with contextlib.AsyncExitStack() as stack:
+            if self._notifier_is_async():
+                # Async notifiers own an event-loop bound client; open it for this dispatch only.
+                await stack.enter_async_context(self._notifier)
+            results = await asyncio.gather(*[notify(r, i) for r, i in pairs], return_exceptions=True)
+
+        # Every recipient got its attempt; surface failures like the sequential path would.
+        failures = [(r, res) for (r, _), res in zip(pairs, results) if isinstance(res, BaseException)]
+        for recipient, exc in failures:
+            LOGGER.error("Rotation notice to %s failed: %s", recipient, exc)
+        if failures:
+            raise failures[0][1]
+
+    async def _send_notice_async(
+        self,
+        recipient: str,
+        items: List[RotationCandidate],
+        policy_summary: str,
+    ) -> Any:
+        if self._notifier_is_async():
+            return await self._notifier.send_rotation_notice(recipient, items, policy_summary)
+        publish = functools.partial(self._notifier.send_rotation_notice, recipient, items, policy_summary)
+        executor = getattr(self._notifier, "_executor", None)
+        if executor is not None:
+            # Stay on the notifier's own workers (sized to its connection pool).
+            return await asyncio.get_running_loop().run_in_executor(executor, publish)
+        return await asyncio.to_thread(publish)
+
+    def _notifier_is_async(self) -> bool:
+        return inspect.iscoroutinefunction(getattr(self._notifier, "send_rotation_notice", None))
 
     def _digest_has_changed(self, candidates: Sequence[RotationCandidate]) -> bool:
         """Persist a content hash so repeated runs with identical due sets don’t resend."""
         state_file = os.getenv("ROTATION_STATE_FILE", ".rotation_state.json")
-        payload = [{"id": c.item.id, "due": c.due_at.isoformat()} for c in candidates]
-        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        # Feed the hasher per candidate rather than serializing the whole set first.
+        hasher = hashlib.sha256()
+        for c in sorted(candidates, key=lambda c: c.item.id):
+            hasher.update(c.item.id.encode("utf-8"))
+            hasher.update(b"|")
+            hasher.update(c.due_at.isoformat().encode("utf-8"))
+            hasher.update(b"\n")
+        digest = hasher.hexdigest()
         path = pathlib.Path(state_file)
         prev = None
-        if path.exists():
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self._state_mtime:
+            # Unchanged since we last read or wrote it; skip re-parsing.
+            prev = self._state_hash
+        elif mtime is not None:
             try:
                 prev = json.loads(path.read_text()).get("last_hash")
             except Exception:
                 prev = None
+            self._state_mtime, self._state_hash = mtime, prev
         if digest == prev:
             return False
         try:
-            path.write_text(json.dumps({"last_hash": digest}))
+            # Write-then-rename so a crash mid-write never leaves a truncated state file.
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(json.dumps({"last_hash": digest}))
+            os.replace(tmp, path)
+            self._state_mtime, self._state_hash = path.stat().st_mtime, digest
         except Exception:
             # Best-effort only; don't crash if state file isn't writable
             pass
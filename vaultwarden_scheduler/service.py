@@ -10,9 +10,9 @@ from typing import Optional, Sequence
 
 from dotenv import find_dotenv, load_dotenv
 
-from .client import VaultwardenClient
+from .client import AsyncVaultwardenClient, VaultwardenClient
 from .config import NotificationConfig, RotationPolicy, VaultwardenConfig
-from .notification import AWSSNSNotifier
+from .notification import AsyncAWSSNSNotifier, AWSSNSNotifier
 from .scheduler import PasswordRotationScheduler
 
 LOGGER = logging.getLogger("vaultwarden_scheduler.service")
@@ -61,8 +61,12 @@ def build_scheduler_from_env() -> PasswordRotationScheduler:
     )
 
     client = VaultwardenClient(vault_config)
-    notifier = AWSSNSNotifier(notification_config)
-    return PasswordRotationScheduler(client=client, policy=policy, notifier=notifier)
+    async_client = AsyncVaultwardenClient(vault_config) if _bool_env("ROTATION_ASYNC_CLIENT") else None
+    if _bool_env("ROTATION_ASYNC_NOTIFIER"):
+        notifier = AsyncAWSSNSNotifier(notification_config)
+    else:
+        notifier = AWSSNSNotifier(notification_config)
+    return PasswordRotationScheduler(client=client, policy=policy, notifier=notifier, async_client=async_client)
 
 
 def run_scheduler_loop() -> None:
@@ -89,13 +93,29 @@ def run_scheduler_loop() -> None:
             elapsed = time.monotonic() - start
             LOGGER.debug("Run duration %.2fs", elapsed)
 
-    execute_once()
-    if run_once:
-        return
-
-    while True:
-        time.sleep(poll_seconds)
+    try:
+        # Fixed-period schedule: tick N fires at start + N * poll_seconds, so the
+        # run duration doesn't accumulate as drift.
+        next_tick = time.monotonic() + poll_seconds
         execute_once()
+        if run_once:
+            return
+
+        while True:
+            now = time.monotonic()
+            if poll_seconds > 0 and now >= next_tick:
+                # The last run overran its slot; restart the schedule rather than firing a backlog.
+                LOGGER.warning(
+                    "Scheduler run overran the %ss poll interval by %.2fs",
+                    poll_seconds,
+                    now - next_tick,
+                )
+                next_tick = now + poll_seconds
+            time.sleep(max(0.0, next_tick - now))
+            next_tick += poll_seconds
+            execute_once()
+    finally:
+        scheduler.close()
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:  # noqa: D401